@@ -0,0 +1,322 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import re
+import io
+import functools
+import csv
+import os
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------------
+# Register Parsing and Cleaning Helpers
+# -------------------------
+# PDF register lines: columns are separated by runs of whitespace, and the
+# second column is either an eligibility date or a short marker code.
+_DATE_RE = re.compile(r"\d{2}/\d{2}/\d{4}")
+_MARKER_RE = re.compile(r'[A-Z]{1,3}')
+# Two or more whitespace characters, for Arrow's RE2 engine. Python's \s is spelled
+# out as an explicit class so the split matches re.split(r'\s{2,}') exactly.
+_ARROW_WS_PATTERN = r"[\t\n\x0b\f\r\x1c-\x1f \x{85}\x{a0}\x{1680}\x{2000}-\x{200a}\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}]{2,}"
+
+MARKER_MAPPING = {
+    'F': 'Overseas voter – Parliamentary only',
+    'G': 'EU citizen – local elections only',
+    'B': 'EU citizen (retained rights/qualifying)',
+    'L': 'Peer – local elections only',
+    'M': 'Qualifying foreign citizen – local elections only',
+    'N': 'Attainer (not yet voting age)',
+}
+# Marker codes index straight into the label array; code 0 is the blank marker
+MARKER_CATEGORIES = pd.Index([''] + list(MARKER_MAPPING))
+MARKER_LABELS = np.array([''] + list(MARKER_MAPPING.values()), dtype=object)
+
+# Only called with stripped, upper-cased markers so " f" and "F" share one cache
+# entry; bounded because a garbled marker column could otherwise grow it without limit
+@functools.lru_cache(maxsize=256)
+def _translate_normalised_marker(marker):
+    date_match = _DATE_RE.match(marker)
+    if date_match:
+        return f"Will become eligible to vote on {date_match.group()}"
+    output = []
+    for char in marker:
+        output.append(MARKER_MAPPING.get(char, f"Unknown ({char})"))
+    return ", ".join(output)
+
+def translate_marker_vectorized(series):
+    # Translates a whole marker column at once; only multi-character markers fall
+    # back to the cached scalar translation. Casting to Arrow strings first runs the
+    # strip/upper passes as Arrow kernels.
+    s = series.astype("string[pyarrow]").fillna("").str.strip().str.upper()
+    lengths = s.str.len()
+    codes = MARKER_CATEGORIES.get_indexer(s)
+    translated = pd.Series(MARKER_LABELS[codes], index=s.index)
+    unknown = pd.Series(codes == -1, index=s.index)
+    translated[unknown] = "Unknown (" + s[unknown] + ")"
+
+    # A boolean match mask is cheaper than extracting a capture group; the date is
+    # always the first ten characters of a matching marker
+    has_date = s.str.match(_DATE_RE.pattern)
+    translated[has_date] = "Will become eligible to vote on " + s[has_date].str.slice(0, 10)
+
+    # Multi-character markers (e.g. "FG") are rare and repeat a handful of values,
+    # so the cached scalar translation only runs once per distinct marker
+    multi = (lengths > 1) & ~has_date
+    if multi.any():
+        translated[multi] = s[multi].map(_translate_normalised_marker)
+    return translated
+
+def parse_register_lines(lines, show_debug=False):
+    if not lines:
+        return None, []
+
+    # Split every line at once into a column per field. Lines with no multi-space
+    # separators fall back to comma-separated fields, dropping empty ones. Arrow-backed
+    # strings keep the strip and match passes in pyarrow's kernels.
+    s = pd.Series(lines, dtype="string[pyarrow]")
+    split = pc.split_pattern_regex(pa.array(lines, type=pa.string()), pattern=_ARROW_WS_PATTERN)
+    n_parts = pd.Series(pc.list_value_length(split).to_numpy(), index=s.index, dtype=np.int64)
+    # Only the first four fields are ever used; shorter lines are padded with nulls
+    first_four = pc.list_slice(split, 0, 4, return_fixed_size_list=True)
+    fields = pd.DataFrame({
+        i: pd.Series(pd.array(pc.list_element(first_four, i), dtype="string[pyarrow]"), index=s.index).str.strip()
+        for i in range(4)
+    })
+
+    single = n_parts == 1
+    if single.any():
+        comma_parts = s[single].str.split(",").explode().str.strip()
+        comma_parts = comma_parts[comma_parts != ""]
+        position = comma_parts.groupby(level=0).cumcount()
+        comma_fields = comma_parts.to_frame("field").set_index(position, append=True)["field"].unstack()
+        fields.loc[single] = comma_fields.reindex(index=s.index[single], columns=fields.columns).astype("string[pyarrow]")
+        n_parts[single] = position.groupby(level=0).size().reindex(s.index[single], fill_value=0)
+
+    parsed = n_parts >= 3
+    debug_lines = []
+    if show_debug:
+        status = np.where(parsed, " ✅ Parsed", " ❌ Skipped - not enough fields")
+        debug_lines = (
+            "Line " + pd.Series(np.arange(1, len(s) + 1), index=s.index).astype(str) + ": '" + s
+            + "' → Split into " + n_parts.astype(str) + " parts." + status
+        ).tolist()
+
+    if not parsed.any():
+        return None, debug_lines
+
+    # The second field is a marker when it is an eligibility date or a short code;
+    # otherwise the line has no marker and the name starts one field earlier
+    fields = fields[parsed]
+    candidate = fields[1]
+    # Arrow string columns only take compiled patterns from pandas 3 on
+    has_marker = candidate.str.match(_DATE_RE.pattern).astype(bool) | candidate.str.fullmatch(_MARKER_RE.pattern).astype(bool)
+    df = pd.DataFrame({
+        "Elector Number": fields[0],
+        "Marker": candidate.where(has_marker, ""),
+        "Name": fields[2].where(has_marker, candidate),
+        "Address": fields[3].fillna("").where(has_marker, fields[2]),
+    }).reset_index(drop=True)
+    df["Elector Marker Type"] = translate_marker_vectorized(df["Marker"]).astype("string[pyarrow]")
+    return df, debug_lines
+
+# Streamlit reruns the app script on every widget change, so anything keyed on the
+# uploaded bytes is cached rather than re-parsed or re-OCR'd each time.
+@st.cache_data
+def load_csv(raw):
+    # Clean each record batch as it is parsed instead of after the whole file is read
+    try:
+        reader = pacsv.open_csv(pa.BufferReader(raw))
+        if any(pa.types.is_binary(field.type) for field in reader.schema):
+            # Arrow reads non-UTF-8 text as binary rather than failing; these are
+            # usually Excel cp1252 exports (e.g. "René"), so decode them as such
+            reader = pacsv.open_csv(pa.BufferReader(raw), read_options=pacsv.ReadOptions(encoding="cp1252"))
+        batches = [add_polling_district(batch.to_pandas(types_mapper=pd.ArrowDtype)) for batch in reader]
+    except pa.ArrowInvalid:
+        # Arrow is stricter than pandas (e.g. column types inferred from the first block
+        # must hold for the whole file), so retry anything it rejects with pandas
+        try:
+            df = pd.read_csv(io.BytesIO(raw), dtype_backend="pyarrow")
+        except UnicodeDecodeError:
+            df = pd.read_csv(io.BytesIO(raw), dtype_backend="pyarrow", encoding="cp1252")
+        return add_polling_district(df)
+    if not batches:
+        # A header-only file infers null columns; give them the text type of a real upload
+        empty = reader.schema.empty_table().to_pandas(types_mapper=pd.ArrowDtype)
+        return add_polling_district(empty.astype(pd.ArrowDtype(pa.string())))
+    return pd.concat(batches, ignore_index=True)
+
+@st.cache_data
+def extract_pdf_lines(raw):
+    import pymupdf
+
+    # One pass over the document: pages with a text layer are read directly and only
+    # scanned pages are queued for OCR, using the same open document. A page without
+    # any font resources can't carry text, so scans skip extraction. Pages with nothing
+    # drawn on them are separators and are skipped, as are scans when Tesseract isn't
+    # available.
+    use_ocr = have_tesseract()
+    with pymupdf.open(stream=raw, filetype="pdf") as doc:
+        pages_text = []
+        ocr_queue = []
+        for page in doc:
+            page_text = page.get_text("text") if page.get_fonts() else ""
+            if page_text.strip():
+                pages_text.append(page_text)
+            elif use_ocr and page.get_bboxlog():
+                ocr_queue.append((page.number, len(pages_text)))
+                pages_text.append(None)
+        ocr_texts = []
+        if ocr_queue:
+            page_numbers = [page_number for page_number, _ in ocr_queue]
+            for (_, slot), page_text in zip(ocr_queue, ocr_pages(doc, page_numbers)):
+                pages_text[slot] = page_text
+                if page_text is not None:
+                    ocr_texts.append(page_text)
+
+    # Split page by page (no joined copy of the whole document) and strip each line once
+    lines = [
+        stripped
+        for page_text in pages_text if page_text is not None
+        for line in page_text.split("\n") if (stripped := line.strip())
+    ]
+    has_text_layer = len(pages_text) > len(ocr_queue)
+    return lines, "\n".join(ocr_texts), len(ocr_texts), has_text_layer
+
+@st.cache_data
+def load_pdf(raw, show_debug=False):
+    # Extraction and OCR are cached on the bytes alone, so toggling debug output only
+    # re-runs the parse
+    lines, ocr_text, ocr_page_count, has_text_layer = extract_pdf_lines(raw)
+    if ocr_page_count and not has_text_layer:
+        # A fully scanned PDF: single-spaced OCR lines would only be half-parsed by the
+        # register parser, so return every line as the raw OCR table for review
+        return lines[:30], ocr_text_to_frame(ocr_text), [], ocr_page_count
+    df, debug_lines = parse_register_lines(lines, show_debug)
+    if df is None and ocr_text.strip():
+        # Raw OCR output rarely has the register's column spacing; keep it reviewable
+        df = ocr_text_to_frame(ocr_text)
+    return lines[:30], df, debug_lines, ocr_page_count
+
+@functools.lru_cache(maxsize=None)
+def _tesserocr_api_class():
+    try:
+        from tesserocr import PyTessBaseAPI
+    except ImportError:
+        return None
+    return PyTessBaseAPI
+
+_tesseract_apis = threading.local()
+
+@st.cache_resource
+def have_tesseract():
+    # In-process tesserocr doesn't need the tesseract binary on PATH
+    return _tesserocr_api_class() is not None or shutil.which("tesseract") is not None
+
+def binarize(image):
+    # Otsu threshold computed from the greyscale histogram, so Tesseract gets a clean
+    # black-and-white page instead of running its own thresholding on full colour
+    from PIL import Image
+    grey = np.asarray(image if image.mode == "L" else image.convert("L"))
+    hist = np.bincount(grey.ravel(), minlength=256).astype(np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    cum_mass = np.cumsum(hist * np.arange(256))
+    mean_bg = cum_mass / np.maximum(weight_bg, 1)
+    mean_fg = (cum_mass[-1] - cum_mass) / np.maximum(weight_fg, 1)
+    threshold = np.argmax(weight_bg * weight_fg * (mean_bg - mean_fg) ** 2)
+    return Image.fromarray(np.where(grey > threshold, 255, 0).astype(np.uint8))
+
+def image_to_text(image):
+    # tesserocr keeps an initialised Tesseract engine in-process (one per thread, as
+    # the API isn't thread-safe); pytesseract spawns the tesseract binary per image
+    # and is only used when tesserocr isn't installed.
+    image = binarize(image)
+    api_class = _tesserocr_api_class()
+    if api_class is None:
+        import pytesseract
+        return pytesseract.image_to_string(image)
+    api = getattr(_tesseract_apis, "api", None)
+    if api is None:
+        api = _tesseract_apis.api = api_class()
+    api.SetImage(image)
+    return api.GetUTF8Text()
+
+def ocr_pages(doc, page_numbers):
+    from PIL import Image
+
+    # Tesseract releases the GIL (and pytesseract runs it as a subprocess), so a
+    # thread pool OCRs pages in parallel while the next page renders. At most one
+    # rendered page per worker is waiting at a time, which bounds memory; results are
+    # collected in page order, with None for pages whose OCR failed.
+    workers = os.cpu_count() or 1
+    page_texts = []
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for page_number in page_numbers:
+            # Render straight to one-channel greyscale (Tesseract works in grey anyway),
+            # a third of the RGB pixmap. The pixels are copied out of samples_mv once,
+            # so the pixmap can be freed while its OCR job is still queued.
+            pixmap = doc[page_number].get_pixmap(dpi=300, colorspace="gray")
+            pil_image = Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples_mv)
+            pending.append(executor.submit(image_to_text, pil_image))
+            if len(pending) > workers:
+                page_texts.append(_ocr_result(pending.popleft()))
+        page_texts.extend(_ocr_result(future) for future in pending)
+    return page_texts
+
+def _ocr_result(future):
+    # A page Tesseract fails on is dropped rather than failing the whole document
+    try:
+        return future.result()
+    except Exception:
+        return None
+
+@st.cache_data
+def ocr_image(raw):
+    from PIL import Image
+    image = Image.open(io.BytesIO(raw))
+    if "A" in image.getbands() or "transparency" in image.info:
+        # Transparent backgrounds would turn black in greyscale, like the text, so
+        # flatten onto white first (as pytesseract did)
+        image = image.convert("RGBA")
+        image = Image.alpha_composite(Image.new("RGBA", image.size, (255, 255, 255, 255)), image)
+    # Decode uploads straight to greyscale so the RGB image is never kept around
+    return image_to_text(image.convert("L"))
+
+def ocr_text_to_frame(ocr_text):
+    # One tab-separated row per non-blank OCR line, parsed in a single streaming pass
+    reader = csv.reader(io.StringIO(ocr_text, newline=""), delimiter="\t", quoting=csv.QUOTE_NONE)
+    rows = pd.DataFrame.from_records(row for row in reader if any(field.strip() for field in row))
+    return rows.astype("string[pyarrow]")
+
+def add_polling_district(df):
+    if "Elector Number" in df.columns:
+        # Shallow copy: the new column is added without duplicating the existing ones
+        df = df.copy(deep=False)
+        df["Polling District"] = df["Elector Number"].str.extract(r'^(?P<district>\w+)', expand=False)
+    return df
+
+@st.cache_data
+def clean_register(df):
+    return add_polling_district(df)
+
+def to_csv_bytes(df):
+    # Arrow's C++ writer emits UTF-8 bytes directly. Its text differs slightly from
+    # pandas (quoted strings, true/false, 2 rather than 2.0), which is still valid CSV.
+    # pandas is kept for repeated headers and mixed object columns Arrow can't convert.
+    if df.columns.is_unique:
+        try:
+            sink = pa.BufferOutputStream()
+            pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), sink)
+            return sink.getvalue().to_pybytes()
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    csv_buffer = io.BytesIO()
+    df.to_csv(csv_buffer, index=False, encoding='utf-8')
+    return csv_buffer.getvalue()
@@ -1,13 +1,13 @@
 import streamlit as st
-import pandas as pd
-import re
-import pdfplumber
-import pytesseract
-from PIL import Image
-import io
-import platform
-import subprocess
-from datetime import datetime
+from register_core import (
+    load_csv,
+    load_pdf,
+    ocr_image,
+    ocr_text_to_frame,
+    have_tesseract,
+    clean_register,
+    to_csv_bytes,
+)
 
 # -------------------------
 # Title and Instructions
@@ -36,101 +36,50 @@ show_debug = st.checkbox("Show Debug Output (For developers only)", value=False)
 if input_method == "Upload CSV":
     uploaded_file = st.file_uploader("Upload raw electoral register CSV", type=["csv"])
     if uploaded_file:
-        df_raw = pd.read_csv(uploaded_file)
-        st.success("CSV file uploaded successfully.")
+        try:
+            df_raw = load_csv(uploaded_file.getvalue())
+            st.success("CSV file uploaded successfully.")
+        except Exception as e:
+            st.error(f"Could not process CSV file: {e}")
 
 elif input_method == "Upload PDF":
     pdf_file = st.file_uploader("Upload scanned or digital electoral register PDF", type=["pdf"])
     if pdf_file:
+        pdf_bytes = pdf_file.getvalue()
         try:
-            with pdfplumber.open(pdf_file) as pdf:
-                pages_text = []
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        pages_text.append(page_text)
-                text = "\n".join(pages_text)
-
-            if not text.strip():
-                raise ValueError("No extractable text found in PDF. Attempting OCR fallback.")
-
-            lines = [line.strip() for line in text.split("\n") if line.strip()]
-            st.markdown("### 📄 Extracted Lines from PDF")
-            st.text("\n".join(lines[:30]))
-
-            extracted = []
-            debug_lines = []
-
-            for idx, line in enumerate(lines):
-                parts = [part.strip() for part in re.split(r'\s{2,}', line)]
-                if len(parts) == 1:
-                    parts = [p.strip() for p in line.split(",") if p.strip()]
-                debug_msg = f"Line {idx+1}: '{line}' → Split into {len(parts)} parts."
-
-                if len(parts) >= 3:
-                    try:
-                        elector_number = parts[0]
-                        marker_candidate = parts[1]
-                        if re.match(r"\d{2}/\d{2}/\d{4}", marker_candidate):
-                            marker = marker_candidate
-                            name = parts[2]
-                            address = parts[3] if len(parts) > 3 else ""
-                        elif re.fullmatch(r'[A-Z]{1,3}', marker_candidate):
-                            marker = marker_candidate
-                            name = parts[2]
-                            address = parts[3] if len(parts) > 3 else ""
-                        else:
-                            marker = ""
-                            name = marker_candidate
-                            address = parts[2] if len(parts) > 2 else ""
-
-                        extracted.append([elector_number, marker, name, address])
-                        debug_msg += " ✅ Parsed"
-                    except Exception as err:
-                        debug_msg += f" ❌ Failed to parse - {err}"
-                else:
-                    debug_msg += " ❌ Skipped - not enough fields"
+            preview_lines, df_parsed, debug_lines, ocr_page_count = load_pdf(pdf_bytes, show_debug)
+            if ocr_page_count:
+                st.info(f"OCR used for {ocr_page_count} page(s) without extractable text. Please review extracted content.")
 
-                if show_debug:
-                    debug_lines.append(debug_msg)
+            st.markdown("### 📄 Extracted Lines from PDF")
+            st.text("\n".join(preview_lines))
 
             if show_debug and debug_lines:
                 st.markdown("### 🔞 Debug Output")
                 st.text("\n".join(debug_lines))
 
-            if extracted:
-                df_raw = pd.DataFrame(extracted, columns=["Elector Number", "Marker", "Name", "Address"])
-                df_raw["Elector Marker Type"] = df_raw["Marker"].apply(lambda x: translate_marker(x))
-                st.success("Structured data extracted from PDF.")
+            if df_parsed is not None:
+                df_raw = df_parsed
+                if "Elector Number" in df_parsed.columns:
+                    st.success("Structured data extracted from PDF.")
+                else:
+                    st.success("OCR fallback used. Please review extracted content.")
+            elif not preview_lines and not have_tesseract():
+                st.error("No extractable text found in PDF, and OCR is not available in this environment. Please run locally with Tesseract installed or use CSV.")
             else:
                 st.warning("Could not parse PDF lines into structured register format.")
 
         except Exception as e:
-            try:
-                with pdfplumber.open(pdf_file) as pdf:
-                    ocr_text_combined = []
-                    for page in pdf.pages:
-                        image = page.to_image(resolution=300).original
-                        pil_image = Image.frombytes("RGB", image.size, image.tobytes())
-                        text = pytesseract.image_to_string(pil_image)
-                        ocr_text_combined.append(text)
-                ocr_text = "\n".join(ocr_text_combined)
-                rows = [line.split("\t") for line in ocr_text.split("\n") if line.strip()]
-                df_raw = pd.DataFrame(rows)
-                st.success("OCR fallback used. Please review extracted content.")
-            except Exception as fallback_error:
-                st.error(f"Failed to extract PDF content with OCR: {fallback_error}")
+            st.error(f"Failed to extract PDF content: {e}")
 
 elif input_method == "Upload Image (PNG/JPG)":
     image_file = st.file_uploader("Upload a scanned electoral register image (PNG or JPG)", type=["png", "jpg", "jpeg"])
     if image_file:
         try:
-            if platform.system() == "Linux" and not subprocess.getoutput("which tesseract"):
+            if not have_tesseract():
                 raise FileNotFoundError("Tesseract is not available on this platform.")
-            image = Image.open(image_file)
-            ocr_text = pytesseract.image_to_string(image)
-            rows = [line.split("\t") for line in ocr_text.split("\n") if line.strip()]
-            df_raw = pd.DataFrame(rows)
+            ocr_text = ocr_image(image_file.getvalue())
+            df_raw = ocr_text_to_frame(ocr_text)
             st.success("Image scanned and text extracted. Please review below.")
         except FileNotFoundError:
             st.error("OCR is not available in this environment. Please run locally with Tesseract installed or use CSV/PDF.")
@@ -139,47 +88,30 @@ elif input_method == "Paste Table":
     pasted = st.text_area("Paste your register table below:")
     if pasted:
         try:
-            df_raw = pd.read_csv(io.StringIO(pasted))
+            df_raw = load_csv(pasted.encode('utf-8'))
             st.success("Table parsed successfully.")
-        except:
-            st.error("Could not parse pasted table. Make sure it's comma-separated.")
-
-# -------------------------
-# Define Helper Functions
-# -------------------------
-def translate_marker(marker):
-    if pd.isna(marker): return ""
-    marker = marker.strip().upper()
-    date_match = re.match(r"(\d{2}/\d{2}/\d{4})", marker)
-    if date_match:
-        return f"Will become eligible to vote on {date_match.group(1)}"
-    mapping = {
-        'F': 'Overseas voter – Parliamentary only',
-        'G': 'EU citizen – local elections only',
-        'B': 'EU citizen (retained rights/qualifying)',
-        'L': 'Peer – local elections only',
-        'M': 'Qualifying foreign citizen – local elections only',
-        'N': 'Attainer (not yet voting age)',
-    }
-    output = []
-    for char in marker:
-        output.append(mapping.get(char, f"Unknown ({char})"))
-    return ", ".join(output)
+        except Exception as e:
+            st.error(f"Could not parse pasted table. Make sure it's comma-separated. ({e})")
 
 # -------------------------
 # Process and Export
 # -------------------------
 if 'df_raw' in locals():
     try:
-        if "Elector Number" in df_raw.columns:
-            df_raw['Polling District'] = df_raw['Elector Number'].str.extract(r'^(\w+)')[0]
+        # CSV uploads and pasted tables are already cleaned batch by batch. For everything
+        # else only the preview rows are cleaned here; the full register is cleaned and
+        # serialised only when the download is requested.
+        already_clean = input_method in ("Upload CSV", "Paste Table")
 
         st.markdown("### 📜 Cleaned Electoral Register")
-        st.dataframe(df_raw.head(20))
+        st.dataframe(df_raw.head(20) if already_clean else clean_register(df_raw.head(20)))
+
+        def build_download():
+            return to_csv_bytes(df_raw if already_clean else clean_register(df_raw))
 
         st.download_button(
             label="📅 Download Clean CSV",
-            data=df_raw.to_csv(index=False).encode('utf-8'),
+            data=build_download,
             file_name="Clean_Electoral_Register.csv",
             mime="text/csv"
         )
@@ -0,0 +1,42 @@
+import unittest
+
+from register_core import load_csv, to_csv_bytes
+
+HEADER = b"Elector Number,Name,Count\n"
+# Enough rows to push the last line past pyarrow's first 1 MiB read block
+FILLER = b"AB1-1,Smith,1\n" * 100_000
+
+
+class LoadCsvTest(unittest.TestCase):
+    def setUp(self):
+        load_csv.clear()
+
+    def test_adds_polling_district(self):
+        df = load_csv(HEADER + b"AB1-1,Smith,1\nCD2-7,Jones,2\n")
+        self.assertEqual(df["Polling District"].tolist(), ["AB1", "CD2"])
+
+    def test_header_only_file_matches_a_real_upload(self):
+        df = load_csv(HEADER)
+        self.assertEqual(len(df), 0)
+        self.assertEqual(list(df.columns), ["Elector Number", "Name", "Count", "Polling District"])
+        self.assertTrue(all(str(dtype).startswith("string") for dtype in df.dtypes))
+
+    def test_cp1252_in_first_block(self):
+        df = load_csv(HEADER + "AB1-1,René €,1\n".encode("cp1252"))
+        self.assertEqual(df["Name"].tolist(), ["René €"])
+        self.assertIn("René €".encode("utf-8"), to_csv_bytes(df))
+
+    def test_cp1252_after_first_block(self):
+        df = load_csv(HEADER + FILLER + "AB1-2,René,2\n".encode("cp1252"))
+        self.assertEqual(len(df), 100_001)
+        self.assertEqual(df["Name"].iloc[-1], "René")
+
+    def test_type_change_after_first_block(self):
+        df = load_csv(HEADER + FILLER + b"AB1-2,Jones,many\n")
+        self.assertEqual(len(df), 100_001)
+        self.assertEqual(str(df["Count"].iloc[-1]), "many")
+        self.assertEqual(df["Polling District"].iloc[-1], "AB1")
+
+
+if __name__ == "__main__":
+    unittest.main()
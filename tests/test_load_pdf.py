@@ -0,0 +1,75 @@
+import io
+import unittest
+from unittest import mock
+
+import pymupdf
+from PIL import Image
+
+import register_core
+from register_core import extract_pdf_lines, load_pdf
+
+OCR_LINES = "AB1-1 G Smith, Jo\nAB1-2 Jones, Al, 2 High St, Town\nAB1-3 Brown\nAB1-4 N Lee"
+
+
+def make_pdf(pages):
+    doc = pymupdf.open()
+    for page_text in pages:
+        page = doc.new_page()
+        if page_text is None:
+            # A scanned page: an image and no text layer
+            buffer = io.BytesIO()
+            Image.new("L", (50, 50), 128).save(buffer, "PNG")
+            page.insert_image(page.rect, stream=buffer.getvalue())
+        elif page_text:
+            page.insert_text((50, 72), page_text)
+    return doc.tobytes()
+
+
+def fake_ocr_pages(doc, page_numbers):
+    return [OCR_LINES for _ in page_numbers]
+
+
+class LoadPdfTest(unittest.TestCase):
+    def setUp(self):
+        load_pdf.clear()
+        extract_pdf_lines.clear()
+
+    def load(self, pages, ocr=fake_ocr_pages, have_tesseract=True):
+        with mock.patch.object(register_core, "ocr_pages", side_effect=ocr) as ocr_pages, \
+                mock.patch.object(register_core, "have_tesseract", return_value=have_tesseract):
+            return load_pdf(make_pdf(pages)), ocr_pages
+
+    def test_text_pdf_is_parsed_without_ocr(self):
+        (preview, df, _, ocr_page_count), ocr_pages = self.load(["AB1-1    G    Smith, Jo    1 High St", ""])
+        ocr_pages.assert_not_called()
+        self.assertEqual(ocr_page_count, 0)
+        self.assertEqual(preview, ["AB1-1    G    Smith, Jo    1 High St"])
+        self.assertEqual(df["Elector Number"].tolist(), ["AB1-1"])
+
+    def test_scanned_pdf_returns_every_ocr_line(self):
+        (_, df, _, ocr_page_count), _ = self.load([None])
+        self.assertEqual(ocr_page_count, 1)
+        self.assertNotIn("Elector Number", df.columns)
+        self.assertEqual(df[0].tolist(), OCR_LINES.split("\n"))
+
+    def test_mixed_pdf_merges_ocr_lines_into_the_parse(self):
+        ocr = lambda doc, page_numbers: ["AB1-9    F    Scan, Sam    9 Scan Rd"]
+        (_, df, _, ocr_page_count), ocr_pages = self.load(["AB1-1    G    Smith, Jo    1 High St", None], ocr=ocr)
+        self.assertEqual(ocr_pages.call_args.args[1], [1])
+        self.assertEqual(ocr_page_count, 1)
+        self.assertEqual(df["Elector Number"].tolist(), ["AB1-1", "AB1-9"])
+
+    def test_failed_ocr_pages_are_dropped(self):
+        ocr = lambda doc, page_numbers: [None]
+        (_, df, _, ocr_page_count), _ = self.load(["AB1-1    G    Smith, Jo    1 High St", None], ocr=ocr)
+        self.assertEqual(ocr_page_count, 0)
+        self.assertEqual(df["Elector Number"].tolist(), ["AB1-1"])
+
+    def test_scanned_pages_are_skipped_without_tesseract(self):
+        (preview, df, _, ocr_page_count), ocr_pages = self.load([None], have_tesseract=False)
+        ocr_pages.assert_not_called()
+        self.assertEqual((preview, df, ocr_page_count), ([], None, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
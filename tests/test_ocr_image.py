@@ -0,0 +1,50 @@
+import io
+import unittest
+from unittest import mock
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+import register_core
+from register_core import binarize, ocr_image
+
+
+def png_bytes(image, **params):
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", **params)
+    return buffer.getvalue()
+
+
+class OcrImageTest(unittest.TestCase):
+    def setUp(self):
+        ocr_image.clear()
+
+    def ocr_input(self, raw):
+        with mock.patch.object(register_core, "image_to_text", return_value="") as image_to_text:
+            ocr_image(raw)
+        return image_to_text.call_args.args[0]
+
+    def test_transparent_background_becomes_white(self):
+        image = Image.new("RGBA", (60, 20), (0, 0, 0, 0))
+        ImageDraw.Draw(image).rectangle((10, 5, 30, 15), fill=(0, 0, 0, 255))
+        grey = self.ocr_input(png_bytes(image))
+        self.assertEqual(grey.mode, "L")
+        self.assertEqual(np.unique(np.asarray(binarize(grey))).tolist(), [0, 255])
+        self.assertEqual(grey.getpixel((0, 0)), 255)
+        self.assertEqual(grey.getpixel((20, 10)), 0)
+
+    def test_palette_transparency_becomes_white(self):
+        image = Image.new("P", (60, 20), 0)
+        image.putpalette([0, 0, 0, 10, 10, 10])
+        ImageDraw.Draw(image).rectangle((10, 5, 30, 15), fill=1)
+        grey = self.ocr_input(png_bytes(image, transparency=0))
+        self.assertEqual(grey.getpixel((0, 0)), 255)
+        self.assertEqual(grey.getpixel((20, 10)), 10)
+
+    def test_opaque_image_is_converted_to_greyscale(self):
+        grey = self.ocr_input(png_bytes(Image.new("RGB", (10, 10), (200, 200, 200))))
+        self.assertEqual((grey.mode, grey.getpixel((0, 0))), ("L", 200))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import random
+import re
+import unittest
+
+from register_core import parse_register_lines
+
+MARKER_MAPPING = {
+    'F': 'Overseas voter – Parliamentary only',
+    'G': 'EU citizen – local elections only',
+    'B': 'EU citizen (retained rights/qualifying)',
+    'L': 'Peer – local elections only',
+    'M': 'Qualifying foreign citizen – local elections only',
+    'N': 'Attainer (not yet voting age)',
+}
+
+
+# -------------------------
+# Reference: the original line-by-line parser
+# -------------------------
+def reference_translate_marker(marker):
+    marker = marker.strip().upper()
+    date_match = re.match(r"(\d{2}/\d{2}/\d{4})", marker)
+    if date_match:
+        return f"Will become eligible to vote on {date_match.group(1)}"
+    return ", ".join(MARKER_MAPPING.get(char, f"Unknown ({char})") for char in marker)
+
+
+def reference_parse(lines):
+    extracted = []
+    debug_lines = []
+    for idx, line in enumerate(lines):
+        parts = [part.strip() for part in re.split(r'\s{2,}', line)]
+        if len(parts) == 1:
+            parts = [p.strip() for p in line.split(",") if p.strip()]
+        debug_msg = f"Line {idx+1}: '{line}' → Split into {len(parts)} parts."
+
+        if len(parts) >= 3:
+            elector_number = parts[0]
+            marker_candidate = parts[1]
+            if re.match(r"\d{2}/\d{2}/\d{4}", marker_candidate) or re.fullmatch(r'[A-Z]{1,3}', marker_candidate):
+                marker = marker_candidate
+                name = parts[2]
+                address = parts[3] if len(parts) > 3 else ""
+            else:
+                marker = ""
+                name = marker_candidate
+                address = parts[2]
+            extracted.append([elector_number, marker, name, address, reference_translate_marker(marker)])
+            debug_msg += " ✅ Parsed"
+        else:
+            debug_msg += " ❌ Skipped - not enough fields"
+        debug_lines.append(debug_msg)
+    return extracted, debug_lines
+
+
+class ParseRegisterLinesTest(unittest.TestCase):
+    def assert_matches_reference(self, lines):
+        df, debug_lines = parse_register_lines(lines, show_debug=True)
+        expected_rows, expected_debug = reference_parse(lines)
+        self.assertEqual(debug_lines, expected_debug)
+        if not expected_rows:
+            self.assertIsNone(df)
+            return
+        self.assertEqual(
+            list(df.columns),
+            ["Elector Number", "Marker", "Name", "Address", "Elector Marker Type"],
+        )
+        self.assertEqual(df.astype(object).values.tolist(), expected_rows)
+
+    def test_marker_line(self):
+        self.assert_matches_reference(["AB1-1    G    Smith, Jo    1 High St"])
+
+    def test_multi_character_and_unknown_markers(self):
+        self.assert_matches_reference([
+            "AB1-1  FG  Smith, Jo  1 High St",
+            "AB1-2  X  Jones, Al  2 High St",
+            "AB1-3  NXB  Brown, Cy  3 High St",
+        ])
+
+    def test_date_marker(self):
+        self.assert_matches_reference(["AB1-2  01/02/2027  Jones, Al  2 High St"])
+
+    def test_no_marker(self):
+        self.assert_matches_reference(["AB1-3  Brown, Cy  3 High St", "AB1-4  Lee  4 High St  Extra"])
+
+    def test_comma_fallback(self):
+        self.assert_matches_reference([
+            "AB1-5, M, Green, 5 High St",
+            "AB1-6,,Grey,6 High St",
+            "AB1-7, Only",
+        ])
+
+    def test_short_lines_are_skipped(self):
+        self.assert_matches_reference(["Page 1", "AB1-8  Name only"])
+        self.assertEqual(parse_register_lines([], show_debug=True), (None, []))
+
+    def test_unicode_whitespace_separators(self):
+        self.assert_matches_reference([
+            "AB1-9\u00a0\u00a0L\u00a0 Peer, Pat \u00a09 High St",
+            "AB2-1  B \u3000Doe, Jo\t\t1 Low Rd",
+            "AB2-2\x1c\x1dN\x1e\x1fKid, Al\u2003\u20032 Low Rd",
+            "AB2-3\u200b\u200bF  Not, Split  3 Low Rd",
+        ])
+
+    def test_debug_lines_only_when_requested(self):
+        self.assertEqual(parse_register_lines(["AB1-1  G  Smith  1 High St"])[1], [])
+
+    def test_random_lines_match_reference(self):
+        rng = random.Random(0)
+        tokens = ["AB1-1", "G", "FG", "x", "01/02/2027", "Smith, Jo", "1 High St", "", ",", "a,b"]
+        separators = [" ", "  ", "   ", "\t", "  ", ",", ", ", "  "]
+        lines = []
+        for _ in range(500):
+            parts = [rng.choice(tokens) for _ in range(rng.randint(1, 6))]
+            line = "".join(part + rng.choice(separators) for part in parts).strip()
+            if line:
+                lines.append(line)
+        self.assert_matches_reference(lines)
+
+
+if __name__ == "__main__":
+    unittest.main()